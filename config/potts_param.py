@@ -1,7 +1,18 @@
+from __future__ import annotations
+
 import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from types import MappingProxyType
 import numpy as np
 import yaml
-from typing import Dict, Any
+from typing import Any, Dict, Mapping, Sequence
+
+# Use the libyaml bindings when PyYAML has been built with them
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 """
     Load configuration parameters for a Potts kMC simulation.
@@ -14,21 +25,62 @@ from typing import Dict, Any
 """
 
 
-def load_from_yaml(filename: str) -> Dict[str, Any]:
+def _freeze_yaml(node: Any) -> Any:
+    """Recursively convert the parsed YAML to read-only mappings and tuples."""
+    if isinstance(node, dict):
+        return MappingProxyType(
+            {key: _freeze_yaml(value) for key, value in node.items()}
+        )
+    if isinstance(node, list):
+        return tuple(_freeze_yaml(value) for value in node)
+    return node
+
+
+@lru_cache(maxsize=8)
+def _load_yaml_cached(filename: str, mtime: float) -> Mapping[str, Any]:
+    """
+    Parse the YAML file once per (filename, mtime).
+    The result is shared between callers, hence deep-frozen:
+    nested mappings are read-only and lists are converted to tuples.
+    """
     with open(filename, "r") as file:
-        return yaml.safe_load(file)
+        return _freeze_yaml(yaml.load(file, Loader=SafeLoader))
 
 
-class Potts_Param:
-    def __init__(self, filename: str):
-        """
-        The Potts_Param object prepare all necessary simulation parameters
-        for a Potts model kinetic Monte Carlo simulation.
-        """
-        self.params = load_from_yaml(filename)
-        self.initialize_parameters()
+def load_from_yaml(filename: str) -> Mapping[str, Any]:
+    return _load_yaml_cached(filename, os.path.getmtime(filename))
+
 
-    def initialize_parameters(self):
+@dataclass(frozen=True, slots=True, eq=False)
+class Potts_Param:
+    """
+    The Potts_Param object prepare all necessary simulation parameters
+    for a Potts model kinetic Monte Carlo simulation.
+
+    Instances are built from a YAML file with from_yaml() (or the cached from_file()).
+    """
+
+    # discrete values
+    hatch: Sequence[int]
+    starting_pos: Sequence[str]
+    heading: Sequence[str]
+    exp_factor: Sequence[float]
+    # range values
+    v_scan: np.ndarray
+    melt_tail_length: np.ndarray
+    melt_depth: np.ndarray
+    cap_height: np.ndarray
+    spot_width: np.ndarray
+    HAZ_width: np.ndarray
+    # values with offset
+    HAZ_tail: np.ndarray
+    depth_HAZ: np.ndarray
+    cap_HAZ: np.ndarray
+    # the YAML configuration
+    params: Mapping[str, Any]
+
+    @classmethod
+    def from_yaml(cls, filename: str) -> Potts_Param:
         """
         Initializes simulation parameters by loading different types of values.
 
@@ -37,29 +89,72 @@ class Potts_Param:
         load_values_with_offset(): Handles calculation of parameters based on other,
                                    previously loaded parameters with additional offsets.
         """
-        self.load_discrete_values()
-        self.load_range_values()
-        self.load_values_with_offset()
+        params = load_from_yaml(filename)
+        values = {"params": params}
+        cls.load_discrete_values(params, values)
+        cls.load_range_values(params, values)
+        cls.load_values_with_offset(params, values)
+
+        attributes = {field.name for field in fields(cls)}
+        unknown = ", ".join(sorted(values.keys() - attributes))
+        if unknown:
+            raise ValueError(f"Unknown attribute(s) '{unknown}' in {filename}.")
+        missing = ", ".join(sorted(attributes - values.keys()))
+        if missing:
+            raise ValueError(
+                f"Required attribute(s) '{missing}' not found in {filename}."
+            )
+        return cls(**values)
+
+    @classmethod
+    def from_file(cls, filename: str) -> Potts_Param:
+        """
+        Return the Potts_Param of a YAML file, shared between callers as long as the file is unchanged.
 
-    def load_discrete_values(self):
+        The YAML parsing and the computation of the ranges only happen once per (filename, mtime).
+        Since the instance is shared, its values are read-only too: arrays are flagged
+        as non-writeable and lists are converted to tuples.
+        """
+        return cls._from_file_cached(filename, os.path.getmtime(filename))
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _from_file_cached(cls, filename: str, mtime: float) -> Potts_Param:
+        params = cls.from_yaml(filename)
+        params._freeze()
+        return params
+
+    def _freeze(self):
+        """Make the loaded values immutable, see from_file()."""
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            elif isinstance(value, list):
+                object.__setattr__(self, field.name, tuple(value))
+
+    @staticmethod
+    def load_discrete_values(params: Mapping[str, Any], values: Dict[str, Any]):
         """
         Loads discrete values directly from the configuration.
         These are standalone parameters that do not depend on other parameters.
         """
         # Assuming 'discrete_values' is a key in the YAML's root dictionary
-        discrete_values = self.params["discrete_values"]
+        discrete_values = params["discrete_values"]
         for key, value in discrete_values.items():
-            setattr(self, key, value)
+            # the cached YAML document is shared (frozen): copy the lists
+            values[key] = list(value) if isinstance(value, (list, tuple)) else value
 
-    def load_range_values(self):
+    @staticmethod
+    def load_range_values(params: Mapping[str, Any], values: Dict[str, Any]):
         """
         Loads continuous range values specified by start, stop, and step values
         They may depend on other parameters, defined by 'base'.
         """
-        range_values = self.params.get("range", {})
+        range_values = params.get("range", {})
         for key, details in range_values.items():
             if "base" in details:
-                base_value = self._get_attribute_value(details["base"])
+                base_value = Potts_Param._get_attribute_value(values, details["base"])
 
                 start = base_value[0] + details["start"]
                 stop = base_value[0] + details["stop"]
@@ -71,40 +166,36 @@ class Potts_Param:
 
             # Use np. linspace() when the exact values for the start and end points of your range are the important attributes.
             # Use np. arange() when the step size between values is more important.
-            values = np.arange(start, stop, step)
-            setattr(self, key, values)
+            values[key] = np.arange(start, stop, step)
 
-    def load_values_with_offset(self):
+    @staticmethod
+    def load_values_with_offset(params: Mapping[str, Any], values: Dict[str, Any]):
         """Compute values by adding an offset to a base value."""
-        offset_values = self.params.get("offset", {})
+        offset_values = params.get("offset", {})
         for key, details in offset_values.items():
-            base_value = self._get_attribute_value(details["base"])
+            base_value = Potts_Param._get_attribute_value(values, details["base"])
             offset = details.get("offset")
 
-            values = [x + offset for x in base_value]
-            setattr(self, key, values)
+            values[key] = np.asarray(base_value) + offset
 
-    def _get_attribute_value(self, key):
+    @staticmethod
+    def _get_attribute_value(values: Dict[str, Any], key: str):
         """
-        Retrieve the value for a given parameter.
+        Retrieve the value for a given parameter, among the values already loaded.
         Raise an error if value not found.
         """
-        try:
-            value = getattr(self, key)
-            if value is not None:
-                return value
-            else:
-                raise AttributeError(f"Attribute {key} is None.")
-        except AttributeError:
+        value = values.get(key)
+        if value is None:
             raise ValueError(
                 f"Required attribute '{key}' not found in class attributes."
             )
+        return value
 
     def print_attributes(self):
         """Prints all attributes of the instance in a nicely formatted manner."""
         print("Potts_Param Attributes:")
-        for attr, value in sorted(vars(self).items()):
-            print(f"{attr}: {value}")
+        for name in sorted(field.name for field in fields(self)):
+            print(f"{name}: {getattr(self, name)}")
 
 
 if __name__ == "__main__":
@@ -112,6 +203,6 @@ if __name__ == "__main__":
     dirname = os.path.dirname(__file__)
     filename = os.path.join(dirname, "./param_space.yaml")
 
-    params = Potts_Param(filename)
+    params = Potts_Param.from_file(filename)
 
     params.print_attributes()
@@ -14,149 +14,164 @@ Configuration Generation Script:
 import os
 import itertools
 from argparse import ArgumentParser
-from typing import List, Tuple, Optional
+from contextlib import ExitStack
+from typing import Iterable, Iterator, List, Tuple, Optional
 import numpy as np
 
-from concurrent.futures import ProcessPoolExecutor
-
 from potts_param import Potts_Param
 
+# Buffer size of the config files: lines are flushed to disk with one write() per MiB
+WRITE_BUFFER_SIZE = 1 << 20
+# Number of lines joined into a single write() call per chunk file
+WRITE_BATCH_LINES = 4096
+
+# "." is not allowed in config names, e.g. 20.0 becomes 20_0
+_DOT_TO_US = str.maketrans({".": "_"})
+
 
 def _trans_coord(v, h):
-    # v = v*100 # [site/mcs]
-    v = [number * 100 for number in v]
+    v = np.asarray(v) * 100  # [site/mcs]
     h = h * 1  # [sites]
     return v, h
 
 
-def _create_config_name(config_map):
-    config_name_list = []
+def _format_value(item) -> str:
+    """Format a single parameter value for a config name, lists are joined with '_'."""
+    if isinstance(item, list):
+        return "_".join(str(x).translate(_DOT_TO_US) for x in item)
+    return str(item).translate(_DOT_TO_US)
 
-    for config in config_map:
-        # Convert tuple elements to strings, handle lists inside the tuple separately
-        elements = [
-            (
-                str(item).replace(".", "_")
-                if not isinstance(item, list)
-                else "_".join(map(lambda x: str(x).replace(".", "_"), item))
-            )
-            for item in config
-        ]
 
-        # Join all elements with underscores and prepend the "vHpdV_"
-        config_name = "vHpdV_" + "_".join(elements)
-        config_name_list.append(config_name)
+def _create_config_name(config: Tuple[str, ...]) -> str:
+    # the elements of config are already formatted with _format_value
+    return "vHpdV_" + "_".join(config)
 
-    return config_name_list
 
+def _join_lines(config_names: List[str]) -> str:
+    """Join configuration names into the config_file line format ('name\\t' per line)."""
+    if not config_names:
+        return ""
+    return "\t\n".join(config_names) + "\t\n"
 
-def create_config_map(
-    params: Potts_Param,
-    V_laser: List[List[float]],
-) -> Tuple[List[Tuple[float, int, str, str, List[float]]], List[str]]:
+
+def count_configurations(params: Potts_Param, V_laser: List[List[float]]) -> int:
     """
-    Generate a configuration map and associated configuration names based on the provided parameters and V_laser values.
+    Return the number of configurations generated by `iter_config_names`
+    without materializing the Cartesian product.
     """
-
-    # coordinate transform
-    v_mcs, hatch_site = _trans_coord(params.v_scan, params.hatch)
-    all_list = [v_mcs, hatch_site, params.starting_pos, params.heading, V_laser]
-
-    config_map = list(itertools.product(*all_list))
-    config_name_list = _create_config_name(config_map)
-
-    return config_map, config_name_list
+    return (
+        len(params.v_scan)
+        * len(params.hatch)
+        * len(params.starting_pos)
+        * len(params.heading)
+        * len(V_laser)
+    )
 
 
-def _write_chunk(chunk: List[str], output_file: str) -> bool:
+def iter_config_names(
+    params: Potts_Param,
+    V_laser: List[List[float]],
+) -> Iterator[str]:
     """
-    Write a chunk of configuration names to a specified file.
+    Lazily generate the configuration names based on the provided parameters and V_laser values.
 
-    Parameters:
-    - chunk (List[str]): A list of configuration names to be written to the file.
-    - output_file (str): The path to the file where the chunk should be written.
-
-    Each configuration name in the chunk is written to a new line in the file,
-    followed by a tab character.
+    The Cartesian product is iterated once and every name is assembled on the fly,
+    so neither the configuration tuples nor the names are ever held in memory as a whole.
+    The values of each parameter are formatted once up front, the product only joins strings.
+    """
 
-    Example:
-    If chunk = ["config1", "config2"], the file content will be:
-    config1\t
-    config2\t
+    # coordinate transform
+    v_mcs, hatch_site = _trans_coord(params.v_scan, params.hatch)
+    # starting_pos x heading (4 corners x 2 axes) is fused into one precomputed axis
+    corner_heading = [
+        f"{_format_value(pos)}_{_format_value(heading)}"
+        for pos, heading in itertools.product(params.starting_pos, params.heading)
+    ]
+    all_list = [
+        [_format_value(v) for v in v_mcs],
+        [_format_value(h) for h in hatch_site],
+        corner_heading,
+        [_format_value(HAZ) for HAZ in V_laser],
+    ]
 
-    Note:
-    This function will overwrite the content of the file if it already exists.
-    """
-    try:
-        with open(output_file, "w") as file:
-            for config_name in chunk:
-                file.write(config_name + "\t\n")
-        return True
-    except IOError:
-        return False
+    for config in itertools.product(*all_list):
+        yield _create_config_name(config)
 
 
 def amend_config_file_chunks(
-    config_names: List[str], output_dir: str, num_chunks: int = 10
+    config_names: Iterable[str], output_dir: str, num_chunks: int = 10
 ) -> List[Optional[str]]:
     """
-    Split a list of configuration names into chunks and write each chunk to a separate file.
+    Distribute configuration names over `num_chunks` files.
 
     Returns:
     - List[Optional[str]]: A list of file paths where the chunks were successfully written.
-      If writing a chunk fails, `None` is included in the list for that chunk.
-
-    This function calculates the chunk size based on the length of `config_names` and the specified `num_chunks`.
-    It then splits the `config_names` list into chunks and writes each chunk to a separate file in the `output_dir`.
-    The files are named as `config_file_{i}`, where `i` ranges from 1 to `num_chunks`.
+      If opening a chunk file fails, `None` is included in the list for that chunk.
 
-    The writing operation is parallelized to improve efficiency. The number of parallel tasks is determined by the
-    environment variable `SLURM_CPUS_PER_TASK`, defaulting to 1 if not set.
+    All chunk files are opened up front in the `output_dir` and named as `config_file_{i}`,
+    where `i` ranges from 1 to `num_chunks`. The names are consumed one by one from
+    `config_names` (which can be a generator) and written round-robin into the chunk files,
+    so the whole list of configuration names never needs to be held in memory.
+    Each file is buffered with `WRITE_BUFFER_SIZE` bytes, so the lines reach the disk in
+    a few large write() calls instead of one per few kilobytes.
+    Chunk sizes differ by at most one line and no configuration is left out.
 
     Example:
     If config_names = ["config1", "config2", "config3", "config4"] and num_chunks = 2,
     two files will be created in `output_dir`:
-    - config_file_1 containing "config1" and "config2"
-    - config_file_2 containing "config3" and "config4"
+    - config_file_1 containing "config1" and "config3"
+    - config_file_2 containing "config2" and "config4"
 
     Note:
-    If there's an error writing a chunk, an error message is printed, and the respective position in the returned list
-    will contain `None`.
+    If a chunk file cannot be opened, an error message is printed, the respective position
+    in the returned list will contain `None` and its share of lines goes to the other files.
+    This function will overwrite the content of the files if they already exist.
     """
-    chunk_size = len(config_names) // num_chunks
-    chunks = [
-        config_names[i : i + chunk_size]
-        for i in range(0, len(config_names), chunk_size)
-    ]
-
-    print("num of lines in the chunk: ", len(chunks[0]))
-
     output_files = [
         os.path.join(output_dir, f"config_file_{i}") for i in range(1, num_chunks + 1)
     ]
 
-    # Write chunks in parallel
     successful_files = []
-    cpus_per_task = int(os.environ.get("SLURM_CPUS_PER_TASK", 1))
-    with ProcessPoolExecutor(max_workers=cpus_per_task) as executor:
-        results = list(executor.map(_write_chunk, chunks, output_files))
-
-    for was_successful, output_file in zip(results, output_files):
-        if was_successful:
-            successful_files.append(output_file)
-        else:
-            print(f"Error: Failed to write to {output_file}.")
-            successful_files.append(None)
+    with ExitStack() as stack:
+        files = []
+        for output_file in output_files:
+            try:
+                files.append(
+                    stack.enter_context(
+                        open(output_file, "w", buffering=WRITE_BUFFER_SIZE)
+                    )
+                )
+                successful_files.append(output_file)
+            except IOError:
+                print(f"Error: Failed to write to {output_file}.")
+                successful_files.append(None)
+
+        if not files:
+            return successful_files
+
+        # Take the names in batches of WRITE_BATCH_LINES lines per file; the strided
+        # slices of a batch keep the round-robin order and are written in one call.
+        config_names = iter(config_names)
+        batch_size = len(files) * WRITE_BATCH_LINES
+        num_lines = 0
+        while batch := list(itertools.islice(config_names, batch_size)):
+            for i, file in enumerate(files):
+                file.write(_join_lines(batch[i :: len(files)]))
+            num_lines += len(batch)
+
+    print("num of lines in the chunk: ", -(-num_lines // len(files)))
 
     return successful_files
 
 
-def amend_config_file(config_names: List[str], output_dir: str) -> Optional[str]:
+def amend_config_file(config_names: Iterable[str], output_dir: str) -> Optional[str]:
     """
     Write the provided configuration names to a file in the specified directory.
 
     Args:
-    - config_names (List[str]): A list of configuration names to write.
+    - config_names (Iterable[str]): The configuration names to write. A list is written
+      as a single payload, any other iterable (e.g. `iter_config_names`) is streamed
+      in batches of `WRITE_BATCH_LINES` lines through a `WRITE_BUFFER_SIZE` buffer.
     - working_dir (str): The directory where the configuration file should be written.
 
     Returns:
@@ -167,9 +182,20 @@ def amend_config_file(config_names: List[str], output_dir: str) -> Optional[str]
     config_path = os.path.join(output_dir, config_file)
 
     try:
-        with open(config_path, "w") as new_config_file:
-            for config_name in config_names:
-                new_config_file.write(config_name + "\t\n")
+        if isinstance(config_names, list):
+            # Build the whole payload once and hand it to the kernel in a single write()
+            payload = memoryview(_join_lines(config_names).encode("ascii"))
+            fd = os.open(config_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while payload:
+                    payload = payload[os.write(fd, payload) :]
+            finally:
+                os.close(fd)
+        else:
+            config_names = iter(config_names)
+            with open(config_path, "w", buffering=WRITE_BUFFER_SIZE) as new_config_file:
+                while batch := list(itertools.islice(config_names, WRITE_BATCH_LINES)):
+                    new_config_file.write(_join_lines(batch))
 
     except IOError as e:
         print(f"Error: Could not amend config file. Reason: {e}")
@@ -220,17 +246,33 @@ def create_HAZ_permutations(params: Potts_Param) -> List[List[int]]:
         params.exp_factor,
     ]
 
-    def _valid_combination(combination):
-        return (
-            combination[0] < combination[4]  # spot_width < HAZ_width
-            and combination[1] < combination[5]  # melt_tail_length < HAZ_tail
-            and combination[2] < combination[6]  # melt_depth < depth_HAZ
-            and combination[3] < combination[7]  # cap_height < cap_HAZ
-        )
-
-    # Generate all permutations of HAZ parameters and filter by validity
-    HAZ_map = filter(_valid_combination, itertools.product(*HAZ_list))
-    HAZ_map_list = [list(item) for item in HAZ_map]
+    HAZ_arrays = [np.asarray(values) for values in HAZ_list]
+    if not all(array.dtype.kind in "biuf" for array in HAZ_arrays):
+        # Non-numeric ranges can't be compared as arrays, filter tuple by tuple
+        def _valid_combination(combination):
+            return (
+                combination[0] < combination[4]  # spot_width < HAZ_width
+                and combination[1] < combination[5]  # melt_tail_length < HAZ_tail
+                and combination[2] < combination[6]  # melt_depth < depth_HAZ
+                and combination[3] < combination[7]  # cap_height < cap_HAZ
+            )
+
+        HAZ_map = filter(_valid_combination, itertools.product(*HAZ_list))
+        return [list(item) for item in HAZ_map]
+
+    # Broadcast the ranges against each other and filter the whole Cartesian product at once
+    grids = np.meshgrid(*HAZ_arrays, indexing="ij", sparse=True)
+    mask = (
+        (grids[0] < grids[4])  # spot_width < HAZ_width
+        & (grids[1] < grids[5])  # melt_tail_length < HAZ_tail
+        & (grids[2] < grids[6])  # melt_depth < depth_HAZ
+        & (grids[3] < grids[7])  # cap_height < cap_HAZ
+    )
+
+    # Select each parameter column separately so every column keeps its own type
+    # (int vs float), the C-order of the mask matches the order of itertools.product
+    columns = [np.broadcast_to(grid, mask.shape)[mask].tolist() for grid in grids]
+    HAZ_map_list = [list(item) for item in zip(*columns)]
     return HAZ_map_list
 
 
@@ -239,15 +281,14 @@ def main(args):
     output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
 
-    params = Potts_Param(yaml_file)
+    params = Potts_Param.from_file(yaml_file)
     V_laser = create_HAZ_permutations(params)
 
-    config_map, config_name_list = create_config_map(params, V_laser)
-
-    print("num possible configurations: ", len(config_name_list))
+    print("num possible configurations: ", count_configurations(params, V_laser))
 
-    # write config file
-    path = amend_config_file_chunks(config_name_list, output_dir)
+    # stream the config names into the config files
+    config_names = iter_config_names(params, V_laser)
+    path = amend_config_file_chunks(config_names, output_dir)
     print("config_file created: ", path)
 
 
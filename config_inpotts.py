@@ -3,40 +3,58 @@ Last modified on 18 Apr 2024
 @authors: Micheal Mallon (michael.mallon@esa.int), Monica Rotulo (monica.rotulo@surf.nl)
 
 Script that for a given new case_name (ex: 'vHpdV_20_0_20_LL_x_10_60_30_7_40_75_35_12_0_1'):
-    - check if the corresponding folder already exists
-    - if not exists, create folder with case_name as name 
+    - create folder with case_name as name, if it does not exist yet
     - copy init files to case_name folder
     - amend in.potts (update values of parameters in it)
 
-This script is executed on-the-fly every time a new line is read from the config_file.
+This script is executed on-the-fly every time a new line is read from the config_file,
+or once with --config_file to prepare all the cases listed in it.
         
 """
 
+import re
 import shutil
 import os
+import sys
 from argparse import ArgumentParser
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, List, Tuple
 import numpy as np
 
-
-def folder_exists(working_dir: str, config_name: str) -> bool:
-    folder_exists: bool = False
-
-    for root, dirs, files in os.walk(working_dir):
-        for name in dirs:
-            if name.endswith(config_name):
-                folder_exists = True
-                break
-        break
-
-    return folder_exists
+# Number of cases prepared concurrently with --config_file
+MAX_WORKERS = 16
+
+# Placeholder of an amended value in the in.potts template, e.g. @V_x@
+PLACEHOLDER = re.compile(r"@(\w+)@")
+
+# "offset" of the cartesian layer for every (heading, starting_pos) combination.
+# Note that LL/LR and UL/UR share the same offset for both headings.
+LAYER_OFFSETS = {
+    ("x", "LL"): "-100.0 0.0",
+    ("x", "UL"): "100.0 0.0",
+    ("x", "LR"): "-100.0 0.0",
+    ("x", "UR"): "100.0 0.0",
+    ("y", "LL"): "0.0 -100.0",
+    ("y", "UL"): "0.0 100.0",
+    ("y", "LR"): "0.0 -100.0",
+    ("y", "UR"): "0.0 100.0",
+}
+
+# "am cartesian_layer" command of in.potts for every (heading, starting_pos) combination
+LAYER_TEMPLATES = {
+    (heading, starting_pos): (
+        f"am cartesian_layer 1 start {starting_pos} pass_id 1 thickness 25 offset {offset}"
+    )
+    for (heading, starting_pos), offset in LAYER_OFFSETS.items()
+}
 
 
 def create_folder(working_dir, config_name):
     directory = os.path.join(working_dir, config_name)
     try:
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+        os.makedirs(directory, exist_ok=True)
     except OSError as e:
         print("Error: Creating directory. " + directory)
         raise e
@@ -49,10 +67,15 @@ def copy_initial_condition(working_dir, directory, init_file="IN100_3d.init"):
     dst = os.path.join(directory, init_file)
 
     try:
-        # Ensure the destination directory exists; create if it does not
-        os.makedirs(directory, exist_ok=True)
-
-        shutil.copyfile(src, dst)
+        # The init file is read-only input: hard link it instead of copying its data
+        try:
+            os.link(src, dst)
+        except FileExistsError:
+            if not os.path.samefile(src, dst):
+                shutil.copyfile(src, dst)
+        except OSError:
+            # e.g. cross-device link or a file system without hard links
+            shutil.copyfile(src, dst)
     except FileNotFoundError:
         print(
             f"Error: The source file {src} does not exist or the destination cannot be found."
@@ -82,11 +105,27 @@ def create_config_map(config_str: str) -> tuple:
     return (v1, v2, v3, v4, HAZ_list)
 
 
+@lru_cache(maxsize=4)
+def _load_template(path: str) -> Tuple[str, FrozenSet[str]]:
+    """
+    Read the in.potts template once, later cases reuse the cached content.
+    Returns the template and the names of the placeholders found in it.
+    """
+    template = Path(path).read_text()
+    return template, frozenset(PLACEHOLDER.findall(template))
+
+
 def amend_spparks_file(case_name, working_dir, input_file="in.potts_am_IN100_3d"):
     """
-    Create config map from case name string
+    Create config map from case name string and render the in.potts template with it.
+
+    The template marks the amended values with @NAME@ placeholders
+    (@V_x@, @V_y@, @HATCH_x@, @HATCH_y@, @CASE_NAME@, @ATOI_1@ .. @ATOI_9@, @LAYER@),
+    ${...} references are SPPARKS variables and are left untouched.
     """
     config_map = create_config_map(case_name)
+    # KeyError on an unknown (heading, starting_pos) combination
+    LAYER = LAYER_TEMPLATES[(config_map[3], config_map[2])]
 
     src_file = os.path.join(working_dir, input_file)
     case_dir = os.path.join(working_dir, case_name)
@@ -95,100 +134,74 @@ def amend_spparks_file(case_name, working_dir, input_file="in.potts_am_IN100_3d"
     if not os.path.isfile(src_file):
         raise FileNotFoundError(f"The source file {src_file} does not exist.")
 
-    # open files from template & copy new file in the case directory
-    with open(
-        src_file,
-        "r",
-    ) as template, open(dst_file, "a") as new_spparks_file:
-        # calculate single hatch line coordinates
-        V_x = config_map[0]
-        V_y = config_map[0]
-        hatch_x = config_map[1]
-        hatch_y = config_map[1]
-        ATOI = config_map[4]
-        # ATOI = [int(i) for i in ATOI_str[0:8]]
-        # ATOI.append(float(ATOI_str[8:9]))
-
-        if config_map[3] == "x":
-            if config_map[2] == "LL":
-                LAYER = "am cartesian_layer 1 start LL pass_id 1 thickness 25 offset -100.0 0.0"
-            if config_map[2] == "UL":
-                LAYER = "am cartesian_layer 1 start UL pass_id 1 thickness 25 offset 100.0 0.0"
-            if config_map[2] == "LR":
-                LAYER = "am cartesian_layer 1 start LR pass_id 1 thickness 25 offset -100.0 0.0"
-            if config_map[2] == "UR":
-                LAYER = "am cartesian_layer 1 start UR pass_id 1 thickness 25 offset 100.0 0.0"
-        elif config_map[3] == "y":
-            if config_map[2] == "LL":
-                LAYER = "am cartesian_layer 1 start LL pass_id 1 thickness 25 offset 0.0 -100.0"
-            if config_map[2] == "UL":
-                LAYER = "am cartesian_layer 1 start UL pass_id 1 thickness 25 offset 0.0 100.0"
-            if config_map[2] == "LR":
-                LAYER = "am cartesian_layer 1 start LR pass_id 1 thickness 25 offset 0.0 -100.0"
-            if config_map[2] == "UR":
-                LAYER = "am cartesian_layer 1 start UR pass_id 1 thickness 25 offset 0.0 100.0"
-
-        # open file corresponding to the selected file name & write coordinates
-        # in new structure according to template
-        # read content from first file
-        for num, line in enumerate(template):
-            # append content to second file
-            if num <= 10:
-                new_spparks_file.write(line)
-            elif num > 10 and num <= 11:
-                new_spparks_file.write("variable V_x equal " + str(V_x) + "\n")
-            elif num > 11 and num <= 12:
-                new_spparks_file.write("variable V_y equal " + str(V_y) + "\n")
-            elif num > 12 and num <= 14:
-                new_spparks_file.write(line)
-            elif num > 14 and num <= 15:
-                new_spparks_file.write("variable HATCH_x equal " + str(hatch_x) + "\n")
-            elif num > 15 and num <= 16:
-                new_spparks_file.write("variable HATCH_y equal " + str(hatch_y) + "\n")
-            elif num > 16 and num <= 24:
-                new_spparks_file.write(line)
-            elif num > 24 and num <= 25:
-                new_spparks_file.write(
-                    "variable case_name universe " + case_name + "\n"
-                )
-            elif num > 25 and num <= 30:
-                new_spparks_file.write(line)
-            elif num > 30 and num <= 31:
-                new_spparks_file.write("variable ATOI_1 equal " + str(ATOI[0]) + "\n")
-            elif num > 31 and num <= 32:
-                new_spparks_file.write("variable ATOI_2 equal " + str(ATOI[1]) + "\n")
-            elif num > 32 and num <= 33:
-                new_spparks_file.write("variable ATOI_3 equal " + str(ATOI[2]) + "\n")
-            elif num > 33 and num <= 34:
-                new_spparks_file.write("variable ATOI_4 equal " + str(ATOI[3]) + "\n")
-            elif num > 34 and num <= 35:
-                new_spparks_file.write("variable ATOI_5 equal " + str(ATOI[4]) + "\n")
-            elif num > 35 and num <= 36:
-                new_spparks_file.write("variable ATOI_6 equal " + str(ATOI[5]) + "\n")
-            elif num > 36 and num <= 37:
-                new_spparks_file.write("variable ATOI_7 equal " + str(ATOI[6]) + "\n")
-            elif num > 37 and num <= 38:
-                new_spparks_file.write("variable ATOI_8 equal " + str(ATOI[7]) + "\n")
-            elif num > 38 and num <= 39:
-                new_spparks_file.write("variable ATOI_9 equal " + str(ATOI[8]) + "\n")
-            elif num > 39 and num <= 93:
-                new_spparks_file.write(line)
-            elif num > 93 and num <= 94:
-                new_spparks_file.write(LAYER + "\n")
-            elif num > 94 and num <= 97:
-                new_spparks_file.write(line)
-            else:
-                new_spparks_file.write(line)
+    template, placeholders = _load_template(src_file)
+
+    # calculate single hatch line coordinates
+    V_x = config_map[0]
+    V_y = config_map[0]
+    hatch_x = config_map[1]
+    hatch_y = config_map[1]
+    ATOI = config_map[4]
+    # ATOI = [int(i) for i in ATOI_str[0:8]]
+    # ATOI.append(float(ATOI_str[8:9]))
+
+    values = {
+        "V_x": V_x,
+        "V_y": V_y,
+        "HATCH_x": hatch_x,
+        "HATCH_y": hatch_y,
+        "CASE_NAME": case_name,
+        "LAYER": LAYER,
+        **{f"ATOI_{i + 1}": value for i, value in enumerate(ATOI)},
+    }
+
+    # every value must end up in the input script, e.g. not a script without placeholders
+    missing = ", ".join(sorted(values.keys() - placeholders))
+    if missing:
+        raise ValueError(f"Placeholder(s) {missing} not found in {src_file}.")
+
+    # substitute all placeholders in one pass, KeyError on an unknown placeholder
+    rendered = PLACEHOLDER.sub(lambda match: str(values[match.group(1)]), template)
+
+    # write the new file in the case directory at once, overwriting a previous run
+    Path(dst_file).write_text(rendered)
+
+
+def _process_one(working_dir: str, case_name: str) -> None:
+    # every step is idempotent, an existing case is simply prepared again
+    case_directory = create_folder(working_dir, case_name)
+    copy_initial_condition(working_dir, case_directory)
+    amend_spparks_file(case_name, working_dir)
 
 
 def main(args):
     working_dir = args.working_dir
-    case_name = args.case_name
 
-    if not folder_exists(working_dir, case_name):
-        case_directory = create_folder(working_dir, case_name)
-        copy_initial_condition(working_dir, case_directory)
-        amend_spparks_file(case_name, working_dir)
+    if args.config_file is None:
+        _process_one(working_dir, args.case_name)
+        return
+
+    with open(args.config_file, "r") as config_file:
+        case_names = [line.strip() for line in config_file if line.strip()]
+
+    # preparing a case is pure file I/O: overlap the cases in a thread pool
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(_process_one, working_dir, case_name)
+            for case_name in case_names
+        ]
+
+    # a failing case does not stop the others, but fails the whole run
+    failed = 0
+    for case_name, future in zip(case_names, futures):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error: preparing case {case_name}: {e!r}")
+            failed += 1
+
+    if failed:
+        sys.exit(f"{failed} of {len(case_names)} cases could not be prepared.")
 
 
 if __name__ == "__main__":
@@ -206,5 +219,11 @@ if __name__ == "__main__":
         default="vHpdV_20_0_20_LL_x_10_60_30_7_40_75_35_12_0_1",
         help="define case_name dir",
     )
+    parser.add_argument(
+        "--config_file",
+        type=str,
+        default=None,
+        help="prepare every case_name listed in the config_file (overrides --case_name)",
+    )
     args = parser.parse_args()
     main(args)
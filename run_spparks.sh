@@ -33,11 +33,11 @@ cd "${WORKDIR}"
 
 chunked_config_file="${WORKDIR}/config_file_${SLURM_ARRAY_TASK_ID}"
 
+# This command will copy the parameter configurations of the whole chunk to the spparks input scripts
+python config_inpotts.py --working_dir "${WORKDIR}" --config_file "${chunked_config_file}" || exit 1
+
 while IFS= read -r line; do
     case_name="$(echo -e "${line}" | sed -e 's/^[[:space:]]*//' -e 's/[[:space:]]*$//')"
-    
-    # This command will copy the parameter configuration to the spparks input script
-    python config_inpotts.py --working_dir "${WORKDIR}" --case_name "${case_name}"
 
     # execute spparks for given configuration
     echo "Processing: ${case_name}/in.potts_am_IN100_3d"
@@ -4,7 +4,7 @@ Last modified: 14 May 2024
 """
 import os
 import re
-from typing import List, Tuple
+from typing import Iterable, Iterator, Tuple
 import numpy as np
 from argparse import ArgumentParser
 
@@ -12,17 +12,58 @@ import h5py
 import vtk
 from vtk.util.numpy_support import vtk_to_numpy, numpy_to_vtk
 
-from visualization_utils import render_2D_from_numpy, numpy_to_vtk_file
+from visualization_utils import (
+    render_2D_from_numpy,
+    numpy_to_vtk_file,
+    close_plotters,
+)
+
+# HDF5 chunk cache, large enough to keep the chunks of a whole experiment resident
+RDCC_NBYTES = 64 << 20
+RDCC_W0 = 0.75
+RDCC_NSLOTS = 10007  # prime, ~100x the number of chunks fitting in the cache
+
+# 'len' followed by an underscore and one or more digits, e.g. "exp_1_len_20_2D.h5"
+LEN_RE = re.compile(r"len_(\d+)")
 
 
 class H5_Handler:
+    """
+    Read experiments from an HDF5 file.
+
+    The file is opened once and kept open for the lifetime of the handler:
+    use it as a context manager (`with H5_Handler(path) as handler:`) or call close().
+    """
+
     def __init__(self, file_path):
         self.file_path = file_path
         self.experiments_length = self.extract_length(file_path)
+        self._file = h5py.File(
+            file_path,
+            "r",
+            rdcc_nbytes=RDCC_NBYTES,
+            rdcc_w0=RDCC_W0,
+            rdcc_nslots=RDCC_NSLOTS,
+        )
+        try:
+            self._images = self._file["images"]
+        except BaseException:
+            # the handler is not returned, nobody else can close the file
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the underlying HDF5 file."""
+        self._file.close()
 
     def extract_length(self, filename):
-        # Use a regular expression to find 'len' followed by an underscore and one or more digits
-        match = re.search(r"len_(\d+)", self.file_path)
+        match = LEN_RE.search(self.file_path)
         if match:
             return int(
                 match.group(1)
@@ -40,9 +81,26 @@ class H5_Handler:
         start_idx = video_idx * self.experiments_length
         end_idx = start_idx + self.experiments_length
 
-        with h5py.File(self.file_path, "r") as file:
-            images = file["images"][start_idx:end_idx]
-        return images
+        return self._images[start_idx:end_idx]
+
+    def iter_experiment(self, video_idx) -> Iterator[np.ndarray]:
+        """
+        Yield the frames of a video one at a time instead of loading them all at once.
+
+        video_index (int): Index of the video for which frames are to be loaded (0-indexed).
+        yield: numpy.ndarray: the next frame of the specified video.
+
+        Only a single frame is held in memory: the yielded array is a buffer that is
+        overwritten by the next frame, copy it if it has to outlive the iteration.
+        """
+        start_idx = video_idx * self.experiments_length
+        end_idx = start_idx + self.experiments_length
+
+        images = self._images
+        frame = np.empty(images.shape[1:], dtype=images.dtype)
+        for idx in range(start_idx, min(end_idx, len(images))):
+            images.read_direct(frame, np.s_[idx])
+            yield frame
 
     def get_total_frames(self):
         """
@@ -50,9 +108,7 @@ class H5_Handler:
 
         return: int, the total number of images in the file.
         """
-        with h5py.File(self.file_path, "r") as file:
-            num_frames = len(file["images"])
-        return num_frames
+        return len(self._images)
 
     def get_total_experiments(self):
         """
@@ -60,20 +116,18 @@ class H5_Handler:
 
         return: int, the total number of experiments stored in the file.
         """
-        with h5py.File(self.file_path, "r") as file:
-            num_frames = len(file["images"])
-
-        return num_frames // self.experiments_length
+        return len(self._images) // self.experiments_length
 
 
 def visualize_all_sequence_from_numpy(
-    sequence: List[np.ndarray], filename: str = "instance"
+    sequence: Iterable[np.ndarray], filename: str = "instance"
 ) -> None:
     """
     Processes a sequence of frames, rendering each as an image.
 
     Args:
-    sequence (List[np.ndarray]): A list of numpy arrays representing image data.
+    sequence (Iterable[np.ndarray]): numpy arrays representing image data,
+        e.g. a list or the frames streamed by H5_Handler.iter_experiment().
     """
     for i, frame in enumerate(sequence):
         if isinstance(frame, np.ndarray):
@@ -82,20 +136,33 @@ def visualize_all_sequence_from_numpy(
             print(f"Skipping index {i}: not a numpy array")
 
 
+def save_all_sequence_to_vtk(
+    sequence: Iterable[np.ndarray], filename: str = "process_2d.vti"
+) -> None:
+    """
+    Converts each frame of a sequence back to a vti file.
+
+    Args:
+    sequence (Iterable[np.ndarray]): numpy arrays representing image data,
+        e.g. a list or the frames streamed by H5_Handler.iter_experiment().
+    """
+    for i, frame in enumerate(sequence):
+        numpy_to_vtk_file(frame, f"{filename}.{i}")
+
+
 def main(args):
     data_path = args.data_path
     experiment = args.experiment
 
-    data_handler = H5_Handler(os.path.join(data_path, experiment))
-
     video_idx = 0  # For example, load frames from video 2 (index 1)
-    sequence_0 = data_handler.load_experiment(video_idx)
 
-    # now you can visualize it or
-    visualize_all_sequence_from_numpy(sequence_0, "image")
+    with H5_Handler(os.path.join(data_path, experiment)) as data_handler:
+        # stream the frames of the video: convert each of them back to vti and/or visualize it
+        for i, frame in enumerate(data_handler.iter_experiment(video_idx)):
+            numpy_to_vtk_file(frame, f"process_2d.vti.{i}")
+            render_2D_from_numpy(frame, filename=f"image_{i}.png")
 
-    for i, frame in enumerate(sequence_0):
-        numpy_to_vtk_file(frame, f"process_2d.vti.{i}")
+    close_plotters()
 
 
 if __name__ == "__main__":
@@ -3,22 +3,29 @@ from typing import List, Tuple, Union, Optional, Dict
 import numpy as np
 import re
 from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import tarfile
-import tempfile
 
 import vtk
 import h5py
 from vtk_data_utils import (
-    read_vtk_instance,
+    read_vtk_instance_from_bytes,
     convert_vtk_instance_to_numpy,
     extract_top_2D_slice_with_voi,
 )
 from vtk_tar_utils import (
     count_folders_in_tar,
-    process_file,
-    process_directory,
+    submit_file,
+    collect_file,
+    collect_directories,
 )
 
+# Number of processes parsing the VTI files, defaults to the CPUs allocated by SLURM
+MAX_WORKERS = int(os.environ.get("SLURM_CPUS_PER_TASK", os.cpu_count() or 1))
+# Number of files read from the TAR archive but not parsed yet
+MAX_IN_FLIGHT = 2 * MAX_WORKERS
+
 
 def save_data_to_hdf5(data_list: List[np.ndarray], output_file: str) -> None:
     with h5py.File(output_file, "w") as hdf_file:
@@ -33,6 +40,9 @@ def extract_vtk_folders_from_tar(
 
     Opens a TAR file, iterates through its contents using a streaming approach to prevent memory overload,
     extracts data and organizes it into a structured format.
+    The TAR archive is read sequentially, while the parsing of the VTI files is spread over
+    a pool of MAX_WORKERS processes, across directories, with at most MAX_IN_FLIGHT files
+    read ahead of the workers.
     It also tracks the number of samples per 'experiment' or directory.
 
     Parameters:
@@ -44,35 +54,50 @@ def extract_vtk_folders_from_tar(
         - each value is a list of lists, each sublist containing vtk.vtkImageData objects from one directory (experiment).
     """
     all_sample = {}
-    temporal_sequence = []
+    temporal_sequence = []  # (n, vtkImageData) of the current directory
+    n_submitted = 0  # files of the current directory submitted to the pool
+    directories = deque()  # temporal sequences of the directories already traversed
+    in_flight = deque()  # (temporal_sequence, future) of the files being parsed
     try:
-        with tarfile.open(tar_path, "r:gz") as tar:
-            for member in iter(lambda: tar.next(), None):
-                if member is None:
-                    continue
-                elif member.isdir():
-                    # print("processing directory:", member.name)
-                    if temporal_sequence:
-                        (temporal_sequence, all_sample) = process_directory(
-                            temporal_sequence, all_sample
-                        )
-                elif member.isfile() and ".vti." in member.name:
-                    # print("processing directory:", member.name)
-                    n_instance = process_file(member, tar, read_vtk_instance)
-                    if n_instance:
-                        temporal_sequence.append(n_instance)
-
-        # Process the last sequence after exiting the loop
-        if temporal_sequence:
-            temporal_sequence, all_sample = process_directory(
-                temporal_sequence, all_sample
-            )
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            try:
+                with tarfile.open(tar_path, "r:gz") as tar:
+                    for member in iter(lambda: tar.next(), None):
+                        if member is None:
+                            continue
+                        elif member.isdir():
+                            # print("processing directory:", member.name)
+                            if n_submitted:
+                                directories.append(temporal_sequence)
+                                temporal_sequence, n_submitted = [], 0
+                        elif member.isfile() and ".vti." in member.name:
+                            # print("processing directory:", member.name)
+                            # bound the file contents read ahead of the workers
+                            while len(in_flight) >= MAX_IN_FLIGHT:
+                                collect_file(in_flight)
+                                all_sample = collect_directories(
+                                    directories, in_flight, all_sample
+                                )
+                            future = submit_file(
+                                executor, member, tar, read_vtk_instance_from_bytes
+                            )
+                            if future:
+                                in_flight.append((temporal_sequence, future))
+                                n_submitted += 1
+
+            except EOFError:
+                print("Warning: Reached corrupted section in tar file")
+            except tarfile.ReadError:
+                print(f"Error reading tar file: {tar_path}")
+                n_submitted = 0  # drop the sequence being read
+
+            # Process the last sequence after exiting the loop
+            if n_submitted:
+                directories.append(temporal_sequence)
+            while in_flight:
+                collect_file(in_flight)
+            all_sample = collect_directories(directories, in_flight, all_sample)
 
-    except EOFError:
-        print("Warning: Reached corrupted section in tar file")
-        temporal_sequence, all_sample = process_directory(temporal_sequence, all_sample)
-    except tarfile.ReadError:
-        print(f"Error reading tar file: {tar_path}")
     except Exception as e:
         print(f"An error occurred while processing the TAR file: {e}")
 
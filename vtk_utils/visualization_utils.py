@@ -4,6 +4,7 @@ last modified on Apr 14
 Utilities for visualize VTK objects
 """
 
+import atexit
 from typing import List, Tuple
 import numpy as np
 import pyvista as pv
@@ -19,6 +20,47 @@ ORIGIN = (0, 0, 0)
 SPACING = (1, 1, 1)
 CELL_DATA = "Spin"  # Used specifically for the Scalars attribute in CellData
 
+# Off-screen rendering state reused across frames, see _get_plotter()
+_XVFB_STARTED = False
+_PLOTTERS = {}  # one plotter per kind of rendering ("2D", "3D")
+
+
+def _start_xvfb():
+    """Start the X virtual framebuffer once per process."""
+    global _XVFB_STARTED
+    if not _XVFB_STARTED:
+        pv.start_xvfb()
+        _XVFB_STARTED = True
+
+
+def _get_plotter(kind: str) -> pv.Plotter:
+    """
+    Return the cached off-screen plotter for the given kind of rendering.
+
+    The plotter (and its OpenGL context) is created on first use and reused for every frame:
+    the actors and scalar bars of the previous frame are removed, lights and camera are kept.
+    """
+    plotter = _PLOTTERS.get(kind)
+    if plotter is None:
+        _start_xvfb()
+        plotter = pv.Plotter(off_screen=True)
+        _PLOTTERS[kind] = plotter
+    else:
+        plotter.clear_actors()
+        plotter.scalar_bars.clear()
+    return plotter
+
+
+def close_plotters():
+    """Close the cached plotters (and their render windows), see _get_plotter()."""
+    for plotter in _PLOTTERS.values():
+        plotter.close()
+    _PLOTTERS.clear()
+
+
+# release the render windows at exit if the scripts did not close them
+atexit.register(close_plotters)
+
 
 def _check_array_dimensions(numpy_array: np.ndarray, extent_size: tuple):
     """
@@ -55,7 +97,7 @@ def render_vtk_image_data(
     """
     dims = vtk_data_object.GetDimensions()
 
-    pv.start_xvfb()  # Start an X virtual framebuffer
+    _start_xvfb()  # Start an X virtual framebuffer
     pv_data = pv.wrap(vtk_data_object)
     plotter = pv.Plotter(off_screen=True)
 
@@ -95,15 +137,13 @@ def render_2D_from_numpy(numpy_array: np.ndarray, filename: str = "visualization
     )  # Note the ordering of dimensions
     grid.spacing = SPACING
     grid.origin = ORIGIN
-    grid.cell_data[CELL_DATA] = numpy_array.flatten(order="C")
+    grid.cell_data[CELL_DATA] = numpy_array.reshape(-1)
 
-    pv.start_xvfb()
-    plotter = pv.Plotter(off_screen=True)
+    plotter = _get_plotter("2D")
     plotter.add_mesh(grid, cmap="viridis", show_edges=False)
 
     plotter.show(auto_close=False)
     plotter.screenshot(filename)
-    plotter.close()
 
 
 def render_3D_from_numpy(numpy_array: np.ndarray, filename: str = "visual_np.png"):
@@ -119,16 +159,14 @@ def render_3D_from_numpy(numpy_array: np.ndarray, filename: str = "visual_np.png
     image = pv.ImageData(EXTENT_SIZE_3D)
     image.spacing = SPACING
     image.origin = ORIGIN
-    image.cell_data[CELL_DATA] = numpy_array.flatten(order="C")
+    image.cell_data[CELL_DATA] = numpy_array.reshape(-1)
 
-    pv.start_xvfb()
-    plotter = pv.Plotter(off_screen=True)
+    plotter = _get_plotter("3D")
 
     plotter.add_volume(image, cmap="viridis", scalar_bar_args={"title": CELL_DATA})
 
     plotter.show(auto_close=False)
     plotter.screenshot(filename)
-    plotter.close()
 
 
 def numpy_to_vtk_file(
@@ -159,22 +197,23 @@ def numpy_to_vtk_file(
     image_data.SetDimensions(new_dims)
     image_data.SetSpacing(spacing)
     image_data.SetOrigin(origin)
-    image_data.AllocateScalars(vtk.VTK_INT, 1)
 
-    # Convert the NumPy array to a VTK array
-    vtk_data_array = numpy_to_vtk(num_array=data_array.ravel(), deep=True)
+    # Wrap the NumPy buffer in a VTK array without copying it:
+    # `cell_values` must stay alive until writer.Write() has returned
+    cell_values = np.ascontiguousarray(data_array).ravel()
+    vtk_data_array = numpy_to_vtk(num_array=cell_values, deep=False)
 
     vtk_data_array.SetName(CELL_DATA)
     vtk_data_array.SetNumberOfComponents(1)
 
     image_data.GetCellData().SetScalars(vtk_data_array)
-    image_data.GetPointData().RemoveArray(0)
 
     writer = vtk.vtkXMLImageDataWriter()
     writer.SetFileName(filename)
     writer.SetInputData(image_data)
-    writer.SetDataModeToAscii()
+    # raw binary appended data with a fast compressor instead of ASCII text
+    writer.SetDataModeToAppended()
     writer.EncodeAppendedDataOff()
-    writer.SetCompressor(None)
+    writer.SetCompressorTypeToLZ4()
 
     writer.Write()
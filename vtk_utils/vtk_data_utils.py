@@ -5,7 +5,9 @@ Utilities for handling VTK data objects
 """
 
 import os
-from typing import List, Tuple
+import re
+import threading
+from typing import Iterator, List, Tuple
 import numpy as np
 from argparse import ArgumentParser
 import pyvista as pv
@@ -15,6 +17,10 @@ import vtk
 from vtk.util.numpy_support import vtk_to_numpy, numpy_to_vtk
 
 CELL_DATA = "Spin"  # Used specifically for the Scalars attribute in CellData
+# SPPARKS output files, one per time step
+VTI_FILE_RE = re.compile(r"^IN1003d\.vti\.(\d+)$")
+
+_READERS = threading.local()  # one vtkXMLImageDataReader per thread
 
 
 """Collection of methods for reading the "subfolder/*.vti.*" generated from SPPARKS"""
@@ -24,9 +30,24 @@ CELL_DATA = "Spin"  # Used specifically for the Scalars attribute in CellData
 
 def read_vtk_instance(filename: str) -> vtk.vtkImageData:
     """Read single vti.n file"""
-    reader = vtk.vtkXMLImageDataReader()
+    reader = getattr(_READERS, "reader", None)
+    if reader is None:
+        reader = _READERS.reader = vtk.vtkXMLImageDataReader()
     reader.SetFileName(filename)
     reader.Update()
+    # the reader output is overwritten by the next call
+    vtk_data_object = vtk.vtkImageData()
+    vtk_data_object.ShallowCopy(reader.GetOutput())
+
+    return vtk_data_object
+
+
+def read_vtk_instance_from_bytes(data: bytes) -> vtk.vtkImageData:
+    """Read single vti.n file from its content already in memory (e.g. a TAR member)"""
+    reader = vtk.vtkXMLImageDataReader()
+    reader.ReadFromInputStringOn()
+    reader.SetInputString(data)
+    reader.Update()
     vtk_data_object = reader.GetOutput()
 
     return vtk_data_object
@@ -114,39 +135,40 @@ def convert_vtk_instance_to_numpy(
 def read_vtk_sample(path: str) -> List[np.ndarray]:
     """We are inside a vHpdV_ folder (that's my sample): read the temporal sequence"""
     """Files stored in file sys"""
-    # Iterate over the range of numbers from vti.0 to vti.N
-    temporal_sample = []
-    n = 0
-    while True:
-        file_path = os.path.join(path, f"IN1003d.vti.{n}")
-        if not os.path.isfile(file_path):
-            break
-
-        instance = read_vtk_instance(file_path)
-        temporal_sample.append(instance)
+    # List the vti.0 to vti.N files in a single pass over the directory
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            match = VTI_FILE_RE.match(entry.name)
+            if match and entry.is_file():
+                entries.append((int(match.group(1)), entry.path))
+    entries.sort()
 
-        n += 1
+    temporal_sample = [read_vtk_instance(file_path) for _, file_path in entries]
 
     return temporal_sample
 
 
-def read_vtk_from_path(data_path: str, config_file: str) -> List[List[np.ndarray]]:
+def iter_vtk_from_path(data_path: str, config_file: str) -> Iterator[List[np.ndarray]]:
     """
-    Read the samples path from config file
+    Read the samples path from config file, yielding one sample at a time
 
     the np.ndarray shape is (100,100,50)
     """
 
-    data_list = []
     with open(config_file, "r") as file:
         for line in file:
             subfolder = line.strip()
             path = os.path.join(data_path, subfolder)
 
-            sample = read_vtk_sample(path)  # sample[0].shape = (100,100,50)
+            yield read_vtk_sample(path)  # sample[0].shape = (100,100,50)
 
-            data_list.append(sample)
 
-    # print(len(data_list[0]))  # single sample
+def read_vtk_from_path(data_path: str, config_file: str) -> List[List[np.ndarray]]:
+    """
+    Read the samples path from config file
+
+    the np.ndarray shape is (100,100,50)
+    """
 
-    return data_list
+    return list(iter_vtk_from_path(data_path, config_file))
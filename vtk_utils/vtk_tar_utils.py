@@ -6,10 +6,15 @@ Utilities for handling VTK data objects stored in TAR file.
 
 import os
 import re
-from typing import List, Tuple, Callable, Optional, Dict
+from concurrent.futures import Executor, Future
+from operator import itemgetter
+from typing import Any, Deque, List, Tuple, Callable, Optional, Dict
 import tarfile
-import tempfile
 import vtk
+from vtk.util.numpy_support import vtk_to_numpy, numpy_to_vtk
+
+# Time index of a SPPARKS output file, e.g. "vHpdV_1/IN1003d.vti.12" -> 12
+VTI_INDEX_RE = re.compile(r"\.vti\.(\d+)")
 
 
 def count_folders_in_tar(
@@ -29,22 +34,19 @@ def count_folders_in_tar(
     os.makedirs(output_dir, exist_ok=True)
     config_path = os.path.join(output_dir, config_file)
 
-    directory_names = []
-    n = 0
+    # ordered set of the case names: a directory listed twice is counted once
+    directory_names = {}
 
     try:
         with tarfile.open(tar_path, "r:gz") as tar:
             for member in iter(lambda: tar.next(), None):
                 if member.isdir():
-                    parts = member.name.split("/")
-                    case_name = parts[-1] if parts else member.name
-                    directory_names.append(case_name)
-                    n += 1
+                    case_name = member.name.rstrip("/").split("/")[-1]
+                    directory_names[case_name] = None
 
         # Save the directory names to a config file
         with open(config_path, "w") as file:
-            for name in directory_names:
-                file.write(name + "\t\n")
+            file.write("".join(name + "\t\n" for name in directory_names))
 
     except EOFError:
         print("Warning: Reached corrupted section in tar file")
@@ -52,53 +54,144 @@ def count_folders_in_tar(
     except tarfile.ReadError:
         print(f"Error reading tar file: {tar_path}")
 
-    return n
+    return len(directory_names)
 
 
-def _extract_to_temporary_file(tar_member, tar) -> str:
+def _image_to_arrays(vtk_data_object: vtk.vtkImageData) -> Dict[str, Any]:
+    """
+    Picklable snapshot of a vtkImageData: its geometry and its data arrays as NumPy arrays.
+    Used to send the images parsed in a worker process back to the parent process.
+    """
+
+    def _arrays(data):
+        scalars = data.GetScalars()
+        return {
+            "arrays": [
+                (data.GetArrayName(i), vtk_to_numpy(data.GetArray(i)))
+                for i in range(data.GetNumberOfArrays())
+            ],
+            "scalars": scalars.GetName() if scalars is not None else None,
+        }
+
+    return {
+        "extent": vtk_data_object.GetExtent(),
+        "spacing": vtk_data_object.GetSpacing(),
+        "origin": vtk_data_object.GetOrigin(),
+        "cell_data": _arrays(vtk_data_object.GetCellData()),
+        "point_data": _arrays(vtk_data_object.GetPointData()),
+    }
+
+
+def _image_from_arrays(image_arrays: Dict[str, Any]) -> vtk.vtkImageData:
+    """
+    Rebuild the vtkImageData from the snapshot created by _image_to_arrays().
+    The VTK arrays share the memory of the NumPy arrays (and keep a reference to them).
     """
-    Extract a tar file member to a temporary file and return the file path.
+    vtk_data_object = vtk.vtkImageData()
+    vtk_data_object.SetExtent(image_arrays["extent"])
+    vtk_data_object.SetSpacing(image_arrays["spacing"])
+    vtk_data_object.SetOrigin(image_arrays["origin"])
+
+    for key, data in (
+        ("cell_data", vtk_data_object.GetCellData()),
+        ("point_data", vtk_data_object.GetPointData()),
+    ):
+        for name, np_array in image_arrays[key]["arrays"]:
+            vtk_array = numpy_to_vtk(np_array, deep=False)
+            vtk_array.SetName(name)
+            data.AddArray(vtk_array)
+        if image_arrays[key]["scalars"] is not None:
+            data.SetActiveScalars(image_arrays[key]["scalars"])
+
+    return vtk_data_object
+
+
+def parse_file_content(
+    n: int,
+    data: bytes,
+    read_instance_function: Callable[[bytes], vtk.vtkImageData],
+) -> Tuple[int, Dict[str, Any]]:
     """
-    with tempfile.NamedTemporaryFile(delete=False) as tmpfile:
-        content = tar.extractfile(tar_member).read()
-        tmpfile.write(content)
-        tmpfile.flush()  # Ensure all data is written to disk
-        return tmpfile.name  # Return the path of the temporary file
+    Parse the content of a '.vti.' file, meant to run in a worker process.
+
+    vtkImageData objects can't be pickled, the parsed image is returned as a
+    snapshot of NumPy arrays (see collect_file()).
+    """
+    return (n, _image_to_arrays(read_instance_function(data)))
 
 
-def process_file(
+def submit_file(
+    executor: Executor,
     member: tarfile.TarInfo,
     tar: tarfile.TarFile,
-    read_instance_function: Callable[[str], vtk.vtkImageData],
-) -> Optional[Tuple[int, vtk.vtkImageData]]:
+    read_instance_function: Callable[[bytes], vtk.vtkImageData],
+) -> Optional[Future]:
     """
     Process an individual file within a TAR archive.
 
-    This function extracts and processes a single file from the TAR archive,
-    specifically a file containing '.vti.' in its name.
-    It extracts the index from the file name and reads the corresponding vtkImageData instance.
+    This function extracts a single file from the TAR archive,
+    specifically a file containing '.vti.' in its name, and extracts the index from the file name.
+    The member content is read from the TAR archive (which can only be read sequentially)
+    and the CPU bound parsing of it is submitted to the executor, e.g. a ProcessPoolExecutor.
 
     Parameters:
+    - executor: The executor parsing the file content.
     - member: A member of the TAR archive representing a file.
     - tar: The TAR file object being processed.
-    - read_instance_function: A function to read vtkImageData from a file path.
+    - read_instance_function: A function to read vtkImageData from the file content (bytes),
+      it must be picklable (a module level function).
 
     Returns:
-      A tuple containing the extracted index and the vtkImageData instance, if the file matches the expected format.
+      A future of the parsed file, to be passed to collect_file().
       Returns None if the file does not match the format or if there is no valid index found.
     """
-    match = re.search(r"\.vti\.(\d+)", member.name)
+    match = VTI_INDEX_RE.search(member.name)
     if match:
         n = int(match.group(1))
 
-        temp_file_path = _extract_to_temporary_file(member, tar)
-        instance = read_instance_function(temp_file_path)
-        return (n, instance)
+        data = tar.extractfile(member).read()
+        return executor.submit(parse_file_content, n, data, read_instance_function)
     else:
         print("No valid index found in file name.")
         return None
 
 
+def collect_file(
+    in_flight: Deque[Tuple[List[Tuple[int, vtk.vtkImageData]], Future]],
+) -> None:
+    """
+    Wait for the oldest file submitted with submit_file() and append it to the
+    temporal sequence of its directory.
+
+    Parameters:
+    - in_flight: The (temporal_sequence, future) pairs of the submitted files, in submission order.
+    """
+    temporal_sequence, future = in_flight.popleft()
+    n, image_arrays = future.result()
+    temporal_sequence.append((n, _image_from_arrays(image_arrays)))
+
+
+def collect_directories(
+    directories: Deque[List[Tuple[int, vtk.vtkImageData]]],
+    in_flight: Deque[Tuple[List[Tuple[int, vtk.vtkImageData]], Future]],
+    all_sample: Dict[int, List[List[vtk.vtkImageData]]],
+) -> Dict[int, List[List[vtk.vtkImageData]]]:
+    """
+    Add the directories whose files have all been collected to all_sample, see process_directory().
+
+    Parameters:
+    - directories: The temporal sequences of the directories whose files have all been submitted,
+      in archive order.
+    - in_flight: The (temporal_sequence, future) pairs of the submitted files, in submission order.
+    - all_sample: See process_directory().
+    """
+    # files are collected in submission order: the oldest directory is complete
+    # as soon as the oldest file in flight belongs to another directory
+    while directories and not (in_flight and in_flight[0][0] is directories[0]):
+        _, all_sample = process_directory(directories.popleft(), all_sample)
+    return all_sample
+
+
 def process_directory(
     temporal_sequence: List[Tuple[int, vtk.vtkImageData]],
     all_sample: Dict[int, List[List[vtk.vtkImageData]]],
@@ -122,7 +215,7 @@ def process_directory(
     sample_count = len(temporal_sequence)
     # sort the instances based on time
     sorted_instances = [
-        instance for _, instance in sorted(temporal_sequence, key=lambda x: x[0])
+        instance for _, instance in sorted(temporal_sequence, key=itemgetter(0))
     ]
 
     if sample_count in all_sample: